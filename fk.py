@@ -7,7 +7,31 @@ from scipy.spatial.transform import Rotation as R
 import pybullet as p
 
 # for geometry information
-from utils.bullet_utils import draw_coordinate, get_matrix_from_pose, get_pose_from_matrix
+from utils.bullet_utils import draw_coordinate, get_matrix_from_pose
+
+# optional : numba gives a big speedup on the small-matrix FK math,
+# but everything still works on the plain NumPy path without it
+try:
+    from numba import njit
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
+# optional : a compiled version of the same kernel without the numba
+# dependency or its warm-up cost; build with "cythonize -i fk_kernel.pyx"
+try:
+    from fk_kernel import fk_jacobian as _fk_jacobian_cython
+except ImportError:
+    _fk_jacobian_cython = None
+
+# optional : jax backend for the batched testcase path, XLA fuses the chain
+# into one kernel and vmap handles the case dimension (GPU-capable too)
+try:
+    import jax
+    import jax.numpy as jnp
+    _HAS_JAX = True
+except ImportError:
+    _HAS_JAX = False
 
 SIM_TIMESTEP = 1.0 / 240.0
 JACOBIAN_SCORE_MAX = 10.0
@@ -19,15 +43,51 @@ TASK1_SCORE_MAX = JACOBIAN_SCORE_MAX + FK_SCORE_MAX
 def cross(a : np.ndarray, b : np.ndarray) -> np.ndarray :
     return np.cross(a, b)
 
-def get_panda_DH_params():
+def _quat_xyzw_from_matrix(m: np.ndarray) -> np.ndarray:
+    """
+        Rotation matrix -> quaternion (x, y, z, w) via Shepperd's method, with
+        the same pivot and sign choices as scipy's Rotation.as_quat, so the
+        output is interchangeable with get_pose_from_matrix -- minus the
+        per-call scipy object construction.
+    """
+
+    q = np.empty(4)
+    trace = m[0, 0] + m[1, 1] + m[2, 2]
+    decision = (m[0, 0], m[1, 1], m[2, 2], trace)
+    choice = decision.index(max(decision))
+
+    if choice != 3:
+        i = choice
+        j = (i + 1) % 3
+        k = (j + 1) % 3
+        q[i] = 1.0 - trace + 2.0 * m[i, i]
+        q[j] = m[j, i] + m[i, j]
+        q[k] = m[k, i] + m[i, k]
+        q[3] = m[k, j] - m[j, k]
+    else:
+        q[0] = m[2, 1] - m[1, 2]
+        q[1] = m[0, 2] - m[2, 0]
+        q[2] = m[1, 0] - m[0, 1]
+        q[3] = 1.0 + trace
+
+    return q / np.sqrt(q[0] * q[0] + q[1] * q[1] + q[2] * q[2] + q[3] * q[3])
+
+def _cross3(a: np.ndarray, b: np.ndarray, out: np.ndarray):
+    # np.cross carries a lot of ufunc dispatch overhead for length-3 inputs,
+    # this is just the six scalar products written into a preallocated slot
+    out[0] = a[1] * b[2] - a[2] * b[1]
+    out[1] = a[2] * b[0] - a[0] * b[2]
+    out[2] = a[0] * b[1] - a[1] * b[0]
+
+def _build_panda_DH_table():
 
     # TODO: this is the DH parameters (follwing Craig's convention) of the robot in this assignment,
-    # It will be a little bit different from the official spec 
+    # It will be a little bit different from the official spec
     # You need to use these parameters to compute the forward kinematics and Jacobian matrix
-    # details : 
+    # details :
     # see "pybullet_robot_envs/panda_envs/robot_data/franka_panda/panda_model.urdf" in this project folder
     # official spec : https://frankaemika.github.io/docs/control_parameters.html#denavithartenberg-parameters
-    
+
     dh_params = [
         {'a':  0,      'd': 0.333, 'alpha':  0,  }, # panda_joint1
         {'a':  0,      'd': 0,     'alpha': -np.pi/2}, # panda_joint2
@@ -38,98 +98,214 @@ def get_panda_DH_params():
         {'a':  0.088,  'd': 0.07,  'alpha':  np.pi/2}, # panda_joint7
     ]
 
-    return dh_params
+    alpha = np.asarray([params['alpha'] for params in dh_params], dtype=np.float64)
+
+    # structure-of-arrays table : the trig of the constant alphas is precomputed
+    # once here instead of on every transform build inside the Jacobian loop
+    return {
+        'a'         : np.asarray([params['a'] for params in dh_params], dtype=np.float64),
+        'd'         : np.asarray([params['d'] for params in dh_params], dtype=np.float64),
+        'alpha'     : alpha,
+        'cos_alpha' : np.cos(alpha),
+        'sin_alpha' : np.sin(alpha),
+    }
+
+# robot-invariant, so computed once at import; the flat aliases below let the
+# JIT dispatch grab the kernel arguments without per-call dict lookups
+_PANDA_DH_TABLE = _build_panda_DH_table()
+_A_CONST = _PANDA_DH_TABLE['a']
+_D_CONST = _PANDA_DH_TABLE['d']
+_COS_ALPHA = _PANDA_DH_TABLE['cos_alpha']
+_SIN_ALPHA = _PANDA_DH_TABLE['sin_alpha']
+
+# -45 degree adjustment along z axis for the end-effector frame, constant so
+# folded at import instead of rebuilt through scipy on every FK call
+# details : see "pybullet_robot_envs/panda_envs/robot_data/franka_panda/panda_model.urdf"
+_Z_ADJUSTMENT = R.from_rotvec([0, 0, -0.785398163397]).as_matrix()
+
+def get_panda_DH_params():
+    return _PANDA_DH_TABLE
+
+# reusable (n, 4, 4) buffer for the per-link transforms : the structurally
+# constant slots (the (0, 2) zero and the [0, 0, 0, 1] bottom row) are written
+# once here, each call only refills the 11 pose-dependent slots
+# note : reusing the buffer is only safe because the FK path is single-threaded
+_T_ALL_BUF = np.zeros((7, 4, 4))
+_T_ALL_BUF[:, 3, 3] = 1.0
 
-def get_transform_to_base_from(level: int, pose: list, DH_params: dict, use_inclusive_range: bool=False) -> np.matrix:
+def _build_link_transforms(level: int, pose: list, DH_params: dict) -> np.ndarray:
     """
-        This function is so complicated because it calculates the T for either all the joints, meaning from 0 <- E, 
-        and at the same time, it must be able to compute the transformation T from any point of reference towards 0.
+        Build the 4x4 transforms of the first `level` links (modified DH
+        convention) in one vectorized step, returned as a (level, 4, 4) view
+        into a preallocated module-level buffer (valid until the next call).
     """
-    
-    T = np.matrix(np.identity(4))
 
-    if level != len(DH_params):
-        use_inclusive_range = True
-        
-    for i in range(level):
-        cos_th_i = np.cos(pose[i])
-        sin_th_i = np.sin(pose[i])
-        a_i = DH_params[i]["a"]
-        cos_alpha_i = np.cos(DH_params[i]["alpha"])
-        sin_alpha_i = np.sin(DH_params[i]["alpha"])
-        d_i = DH_params[i]["d"]
-
-        # modified DH convention
-        T = T @ np.matrix([[cos_th_i, -1*sin_th_i, 0, a_i],
-                [sin_th_i*cos_alpha_i, cos_th_i*cos_alpha_i, -1*sin_alpha_i, -1*d_i*sin_alpha_i],
-                [sin_th_i*sin_alpha_i, cos_th_i*sin_alpha_i, cos_alpha_i, d_i*cos_alpha_i], 
-                [0,0,0,1]])
-
-    if use_inclusive_range:
-        # use this because range(0) won't calculate anything
-        # this case will be ran every time the desired transform is not 
-        # the full one from base to last joint, but only a 
-        # part from it
-        cos_th_i = np.cos(pose[level])
-        sin_th_i = np.sin(pose[level])
-        a_i = DH_params[level]["a"]
-        cos_alpha_i = np.cos(DH_params[level]["alpha"])
-        sin_alpha_i = np.sin(DH_params[level]["alpha"])
-        d_i = DH_params[level]["d"]
-
-        # modified DH convention
-        T = T @ np.matrix([[cos_th_i, -1*sin_th_i, 0, a_i],
-                [sin_th_i*cos_alpha_i, cos_th_i*cos_alpha_i, -1*sin_alpha_i, -1*d_i*sin_alpha_i],
-                [sin_th_i*sin_alpha_i, cos_th_i*sin_alpha_i, cos_alpha_i, d_i*cos_alpha_i], 
-                [0,0,0,1]])
+    thetas = np.asarray(pose[:level], dtype=np.float64)
+    c = np.cos(thetas)
+    s = np.sin(thetas)
+    a = DH_params['a'][:level]
+    d = DH_params['d'][:level]
+    ca = DH_params['cos_alpha'][:level]
+    sa = DH_params['sin_alpha'][:level]
+
+    T_all = _T_ALL_BUF[:level]
+    T_all[:, 0, 0] = c
+    T_all[:, 0, 1] = -s
+    T_all[:, 0, 3] = a
+    T_all[:, 1, 0] = s * ca
+    T_all[:, 1, 1] = c * ca
+    T_all[:, 1, 2] = -sa
+    T_all[:, 1, 3] = -d * sa
+    T_all[:, 2, 0] = s * sa
+    T_all[:, 2, 1] = c * sa
+    T_all[:, 2, 2] = ca
+    T_all[:, 2, 3] = d * ca
+
+    return T_all
+
+def get_transform_to_base_from(level: int, pose: list, DH_params: dict) -> np.ndarray:
+    """
+        Compose the first `level` link transforms into a single 4x4 transform
+        from frame `level` to the base frame (level = 7 gives the full 0 <- E chain).
+    """
 
-    return T
+    T_all = _build_link_transforms(level, pose, DH_params)
 
-def calc_Z(l: int, q: np.ndarray, DH_params: dict, base_pose: np.ndarray) -> np.matrix:
-    Z = (base_pose @ get_transform_to_base_from(l, q, DH_params))[:3,:3] @ np.matrix([[0],
-                                                                                    [0],
-                                                                                    [1]])
-    return Z
+    T = np.eye(4)
+    buf = np.empty((4, 4))
+    for i in range(level):
+        np.matmul(T, T_all[i], out=buf)
+        T, buf = buf, T
 
-def calc_P(l: int, q: np.ndarray, n_joints: int, DH_params: dict, base_pose: np.ndarray) -> np.matrix:
-    P_0E = base_pose @ get_transform_to_base_from(n_joints, q, DH_params) @ np.matrix([[0],
-                                                                                    [0],
-                                                                                    [0],
-                                                                                    [1]])
+    return T
 
-    P_0_from_i_1 = base_pose @ get_transform_to_base_from(l, q, DH_params) @ np.matrix([[0],
-                                                                                    [0],
-                                                                                    [0],
-                                                                                    [1]])
+def _fk_jacobian_kernel(q: np.ndarray, a: np.ndarray, d: np.ndarray,
+                        ca: np.ndarray, sa: np.ndarray, base_pose: np.ndarray):
+    """
+        FK + Jacobian core on raw float64 arrays : one prefix sweep of 4x4
+        products, then the Jacobian columns read off the accumulated
+        transforms. The per-link product T' = T @ A_i is expanded by hand and
+        specialized to the DH structure of A_i (zero at (0, 2), bottom row
+        [0, 0, 0, 1]), which drops the known-zero terms of a generic matmul.
+    """
 
-    P = P_0E - P_0_from_i_1
+    n = q.shape[0]
+
+    Ts = np.empty((n + 1, 4, 4))
+    Ts[0] = base_pose
+
+    for i in range(n):
+        c = np.cos(q[i])
+        s = np.sin(q[i])
+        a10 = s * ca[i]
+        a11 = c * ca[i]
+        a12 = -sa[i]
+        a13 = -d[i] * sa[i]
+        a20 = s * sa[i]
+        a21 = c * sa[i]
+        a22 = ca[i]
+        a23 = d[i] * ca[i]
+
+        for r in range(3):
+            t0 = Ts[i, r, 0]
+            t1 = Ts[i, r, 1]
+            t2 = Ts[i, r, 2]
+            Ts[i + 1, r, 0] = t0 * c + t1 * a10 + t2 * a20
+            Ts[i + 1, r, 1] = -t0 * s + t1 * a11 + t2 * a21
+            Ts[i + 1, r, 2] = t1 * a12 + t2 * a22
+            Ts[i + 1, r, 3] = t0 * a[i] + t1 * a13 + t2 * a23 + Ts[i, r, 3]
+
+        # the homogeneous bottom row never changes
+        Ts[i + 1, 3, 0] = 0.0
+        Ts[i + 1, 3, 1] = 0.0
+        Ts[i + 1, 3, 2] = 0.0
+        Ts[i + 1, 3, 3] = 1.0
+
+    px = Ts[n, 0, 3]
+    py = Ts[n, 1, 3]
+    pz = Ts[n, 2, 3]
+
+    J = np.zeros((6, n))
+    for i in range(n):
+        zx = Ts[i + 1, 0, 2]
+        zy = Ts[i + 1, 1, 2]
+        zz = Ts[i + 1, 2, 2]
+        dx = px - Ts[i + 1, 0, 3]
+        dy = py - Ts[i + 1, 1, 3]
+        dz = pz - Ts[i + 1, 2, 3]
+
+        J[0, i] = zy * dz - zz * dy
+        J[1, i] = zz * dx - zx * dz
+        J[2, i] = zx * dy - zy * dx
+        J[3, i] = zx
+        J[4, i] = zy
+        J[5, i] = zz
+
+    return J, Ts[n].copy()
+
+if _HAS_NUMBA:
+    _fk_jacobian_kernel = njit(cache=True, fastmath=True)(_fk_jacobian_kernel)
+
+def construct_jacobian(n_joints: int, q: np.ndarray, DH_params: dict, base_pose: np.ndarray) -> np.ndarray:
+    """
+        One forward sweep accumulates every partial transform T_0_i, then each
+        Jacobian column is read straight off the cached transforms :
+        Z_i is the joint axis (z column of frame i) and P_i the lever arm to
+        the end effector, so J[:, i] = [Z_i x P_i ; Z_i].
+        The sweep already yields the end-effector transform T_0_E, so it is
+        returned alongside J and callers need no second FK pass.
+    """
 
-    return P[0:3,0]
+    if _fk_jacobian_cython is not None or _HAS_NUMBA:
+        if DH_params is _PANDA_DH_TABLE and n_joints == 7:
+            # the common case : feed the kernel straight from the module constants
+            a, d, ca, sa = _A_CONST, _D_CONST, _COS_ALPHA, _SIN_ALPHA
+        else:
+            a = DH_params['a'][:n_joints]
+            d = DH_params['d'][:n_joints]
+            ca = DH_params['cos_alpha'][:n_joints]
+            sa = DH_params['sin_alpha'][:n_joints]
+        # numba edges out the cython build here, so it stays first choice;
+        # the compiled extension covers setups without numba
+        kernel = _fk_jacobian_kernel if _HAS_NUMBA else _fk_jacobian_cython
+        return kernel(np.asarray(q[:n_joints], dtype=np.float64),
+                      a, d, ca, sa,
+                      np.ascontiguousarray(base_pose, dtype=np.float64))
+
+    A_all = _build_link_transforms(n_joints, q, DH_params)
+
+    # one contiguous prefix buffer : every step writes its slot via out=, so
+    # the sweep does no per-iteration 4x4 allocations
+    Ts = np.empty((n_joints + 1, 4, 4))
+    Ts[0] = base_pose
+    for i in range(n_joints):
+        np.matmul(Ts[i], A_all[i], out=Ts[i + 1])
 
-def construct_jacobian(n_joints: int, q: np.ndarray, DH_params: dict, base_pose: np.ndarray) -> np.matrix:
-    J = np.matrix(np.zeros((6,n_joints)))
+    P_0E = Ts[-1][:3, 3]
 
+    J = np.zeros((6, n_joints))
     for i in range(n_joints):
-        Z = calc_Z(i, q, DH_params, base_pose)
-        P = calc_P(i, q, n_joints, DH_params, base_pose)
+        Z = Ts[i + 1][:3, 2]
+        P = P_0E - Ts[i + 1][:3, 3]
 
-        J_Li = np.cross(np.squeeze(Z), np.squeeze(P))
-        J_Ai = np.squeeze(Z)
+        _cross3(Z, P, J[:3, i])
+        J[3:, i] = Z
 
-        J[:,i] = np.vstack((J_Li.T,J_Ai.T))
-    
-    return J
+    return J, Ts[-1]
 
-def your_fk(robot, DH_params : dict, q : list or tuple or np.ndarray) -> np.ndarray:
+def your_fk(robot, DH_params : dict, q : list or tuple or np.ndarray, base_matrix : np.ndarray=None) -> np.ndarray:
 
-    # robot initial position
-    base_pos = robot._base_position
-    base_pose = list(base_pos) + [0, 0, 0, 1]  
+    # robot initial position : the base is fixed, so callers that evaluate FK
+    # in a loop can convert it once and pass the 4x4 matrix in directly
+    if base_matrix is None:
+        base_pos = robot._base_position
+        base_pose = list(base_pos) + [0, 0, 0, 1]
+        base_matrix = get_matrix_from_pose(base_pose)
 
-    assert len(DH_params) == 7 and len(q) == 7, f'Both DH_params and q should contain 7 values,\n' \
-                                                f'but get len(DH_params) = {DH_params}, len(q) = {len(q)}'
+    assert len(DH_params['a']) == 7 and len(q) == 7, f'Both DH_params and q should contain 7 values,\n' \
+                                                     f'but get len(DH_params) = {len(DH_params["a"])}, len(q) = {len(q)}'
 
-    A = get_matrix_from_pose(base_pose) # a 4x4 matrix, type should be np.ndarray
+    A = base_matrix # a 4x4 matrix, type should be np.ndarray
     jacobian = np.zeros((6, 7)) # a 6x7 matrix, type should be np.ndarray
 
     # -------------------------------------------------------------------------------- #
@@ -142,30 +318,147 @@ def your_fk(robot, DH_params : dict, q : list or tuple or np.ndarray) -> np.ndar
     #### your code ####
 
     # A = ? # may be more than one line
-    A = A @ get_transform_to_base_from(7, q, DH_params)
-        
     # jacobian = ? # may be more than one line
-    n_joints = len(DH_params)
-    jacobian = construct_jacobian(n_joints, q, DH_params, get_matrix_from_pose(base_pose))    
+    # the Jacobian sweep already composes the full chain, so it yields A too;
+    # the base matrix built above is reused instead of converting the pose again
+    n_joints = len(DH_params['a'])
+    jacobian, A = construct_jacobian(n_joints, q, DH_params, A)
 
     # -45 degree adjustment along z axis
-    # details : see "pybullet_robot_envs/panda_envs/robot_data/franka_panda/panda_model.urdf"
-    adjustment = R.from_rotvec([0, 0, -0.785398163397]).as_matrix() # Don't touch
-    A[:3, :3] = A[:3, :3] @ adjustment # Don't touch
+    A[:3, :3] = A[:3, :3] @ _Z_ADJUSTMENT # Don't touch
 
     ###################
 
-    pose_7d = np.asarray(get_pose_from_matrix(A))
+    # read the 7d pose straight off the matrix instead of round-tripping
+    # through get_pose_from_matrix's scipy conversion
+    pose_7d = np.concatenate((A[:3, 3], _quat_xyzw_from_matrix(A[:3, :3])))
 
     return pose_7d, jacobian
 
+if _HAS_JAX:
+    def _fk_jax(q, base, a, d, ca, sa):
+        """
+            Single-pose FK + Jacobian in jax ops; the 7-link loop unrolls at
+            trace time, so the jitted graph is one straight-line kernel.
+        """
+
+        c = jnp.cos(q)
+        s = jnp.sin(q)
+
+        T = base
+        frames = []
+        for i in range(7):
+            A_i = jnp.array([
+                [c[i],         -s[i],        0.0,    a[i]],
+                [s[i] * ca[i], c[i] * ca[i], -sa[i], -d[i] * sa[i]],
+                [s[i] * sa[i], c[i] * sa[i], ca[i],  d[i] * ca[i]],
+                [0.0,          0.0,          0.0,    1.0],
+            ])
+            T = T @ A_i
+            frames.append(T)
+
+        p = T[:3, 3]
+        cols = []
+        for i in range(7):
+            Z = frames[i][:3, 2]
+            P = p - frames[i][:3, 3]
+            cols.append(jnp.concatenate((jnp.cross(Z, P), Z)))
+        J = jnp.stack(cols, axis=1)
+
+        rot = T[:3, :3] @ _Z_ADJUSTMENT
+        return p, rot, J
+
+    # vmap over the case dimension, then jit the whole batch
+    _fk_jax_batch = jax.jit(jax.vmap(_fk_jax, in_axes=(0, None, None, None, None, None)))
+
+def your_fk_batch(robot, DH_params : dict, joint_poses : list or np.ndarray, base_matrix : np.ndarray=None) -> np.ndarray:
+    """
+        Batched version of `your_fk` : evaluates all K joint configurations at
+        once with (K, 4, 4) tensor matmuls instead of a Python loop of
+        per-case calls, so the chain composition runs at BLAS throughput.
+        Returns poses of shape (K, 7) and Jacobians of shape (K, 6, 7).
+    """
+
+    Q = np.asarray(joint_poses, dtype=np.float64)
+    cases_num, n_joints = Q.shape
+
+    assert len(DH_params['a']) == 7 and n_joints == 7, f'Both DH_params and q should contain 7 values,\n' \
+                                                       f'but get len(DH_params) = {len(DH_params["a"])}, n_joints = {n_joints}'
+
+    # robot initial position
+    if base_matrix is None:
+        base_pos = robot._base_position
+        base_pose = list(base_pos) + [0, 0, 0, 1]
+        base_matrix = get_matrix_from_pose(base_pose)
+
+    a = DH_params['a']
+    d = DH_params['d']
+    ca = DH_params['cos_alpha']
+    sa = DH_params['sin_alpha']
+
+    if _HAS_JAX:
+        # XLA fuses the whole chain into one compiled kernel, vmapped over cases
+        pos, rot, jacobians = _fk_jax_batch(Q, base_matrix, a, d, ca, sa)
+        poses_7d = np.concatenate((np.asarray(pos), R.from_matrix(np.asarray(rot)).as_quat()), axis=1)
+        return poses_7d, np.asarray(jacobians, dtype=np.float64)
+
+    c = np.cos(Q)
+    s = np.sin(Q)
+
+    # all K x 7 link transforms in one broadcasted build
+    A_all = np.zeros((cases_num, n_joints, 4, 4))
+    A_all[..., 0, 0] = c
+    A_all[..., 0, 1] = -s
+    A_all[..., 0, 3] = a
+    A_all[..., 1, 0] = s * ca
+    A_all[..., 1, 1] = c * ca
+    A_all[..., 1, 2] = -sa
+    A_all[..., 1, 3] = -d * sa
+    A_all[..., 2, 0] = s * sa
+    A_all[..., 2, 1] = c * sa
+    A_all[..., 2, 2] = ca
+    A_all[..., 2, 3] = d * ca
+    A_all[..., 3, 3] = 1.0
+
+    # prefix-compose the chain with a Hillis-Steele scan : composition of
+    # SE(3) transforms is associative, so the 8 prefixes (base included as
+    # element 0) need only ceil(log2(8)) = 3 doubling rounds, each one a
+    # single batched matmul over all cases and links at once
+    Ts = np.empty((cases_num, n_joints + 1, 4, 4))
+    Ts[:, 0] = base_matrix
+    Ts[:, 1:] = A_all
+    offset = 1
+    while offset <= n_joints:
+        Ts[:, offset:] = np.matmul(Ts[:, :-offset], Ts[:, offset:])
+        offset *= 2
+
+    T_0E = Ts[:, -1]
+
+    # Jacobians, all columns of all cases at once
+    Z = Ts[:, 1:, :3, 2]                                # (K, 7, 3)
+    P = T_0E[:, np.newaxis, :3, 3] - Ts[:, 1:, :3, 3]   # (K, 7, 3)
+    jacobians = np.empty((cases_num, 6, n_joints))
+    jacobians[:, :3, :] = np.cross(Z, P).transpose(0, 2, 1)
+    jacobians[:, 3:, :] = Z.transpose(0, 2, 1)
+
+    # -45 degree adjustment along z axis (same as in `your_fk`)
+    rot = T_0E[:, :3, :3] @ _Z_ADJUSTMENT
+
+    # scipy handles the matrix -> quaternion conversion batched
+    poses_7d = np.concatenate((T_0E[:, :3, 3], R.from_matrix(rot).as_quat()), axis=1)
+
+    return poses_7d, jacobians
+
 # TODO: [for your information]
 # This function is the scoring function, we will use the same code 
 # to score your algorithm using all the testcases
-def score_fk(robot, testcase_files : str, visualize : bool=False):
+def score_fk(robot, testcase_files : str, visualize : bool=False, verbose : bool=False):
 
     testcase_file_num = len(testcase_files)
     dh_params = get_panda_DH_params()
+
+    # the robot base never moves during scoring, convert its pose once
+    base_matrix = get_matrix_from_pose(list(robot._base_position) + [0, 0, 0, 1])
     fk_score = [FK_SCORE_MAX / testcase_file_num for _ in range(testcase_file_num)]
     fk_error_cnt = [0 for _ in range(testcase_file_num)]
     jacobian_score = [JACOBIAN_SCORE_MAX / testcase_file_num for _ in range(testcase_file_num)]
@@ -194,8 +487,11 @@ def score_fk(robot, testcase_files : str, visualize : bool=False):
 
         penalty = (TASK1_SCORE_MAX / testcase_file_num) / (0.3 * cases_num)
 
+        # evaluate all cases of this file in one batched FK call
+        your_poses, your_jacobians = your_fk_batch(robot, dh_params, joint_poses, base_matrix=base_matrix)
+
         for i in range(cases_num):
-            your_pose, your_jacobian = your_fk(robot, dh_params, joint_poses[i])
+            your_pose, your_jacobian = your_poses[i], your_jacobians[i]
             gt_pose = poses[i]
 
             if visualize :
@@ -204,16 +500,27 @@ def score_fk(robot, testcase_files : str, visualize : bool=False):
                 draw_coordinate(your_pose, size=0.01, color=color_yours)
                 draw_coordinate(gt_pose, size=0.01, color=color_gt)
 
-            fk_error = np.linalg.norm(your_pose - np.asarray(gt_pose), ord=2)
-            print("Your pose=\n", your_pose)
-            print("GT pose=\n", gt_pose)
+            fk_error = np.linalg.norm(your_pose - np.asarray(gt_pose))
+            # formatting the arrays per case costs more than computing them,
+            # so dumping them is opt-in
+            if verbose:
+                print("Your pose=\n", your_pose)
+                print("GT pose=\n", gt_pose)
             if fk_error > FK_ERROR_THRESH:
                 fk_score[file_id] -= penalty
                 fk_error_cnt[file_id] += 1
 
-            print("Your jacobian=\n", your_jacobian)
-            print("GT jacobian=\n", jacobians[i])
-            jacobian_error = np.linalg.norm(your_jacobian - np.asarray(jacobians[i]), ord=2)
+            if verbose:
+                print("Your jacobian=\n", your_jacobian)
+                print("GT jacobian=\n", jacobians[i])
+            # the spectral (ord=2) norm needs an SVD per case, but it is upper
+            # bounded by the Frobenius norm, so a case whose Frobenius error is
+            # under the threshold passes without one; only borderline cases pay
+            # for the exact spectral norm
+            jacobian_diff = your_jacobian - np.asarray(jacobians[i])
+            jacobian_error = np.linalg.norm(jacobian_diff)
+            if jacobian_error > JACOBIAN_ERROR_THRESH:
+                jacobian_error = np.linalg.svd(jacobian_diff, compute_uv=False)[0]
             if jacobian_error > JACOBIAN_ERROR_THRESH:
                 jacobian_score[file_id] -= penalty
                 jacobian_error_cnt[file_id] += 1
@@ -0,0 +1,86 @@
+# cython: language_level=3
+# Optional compiled version of the FK + Jacobian kernel in fk.py, for setups
+# that prefer an ahead-of-time extension over the numba JIT (same math, no
+# warm-up cost). Build it with cython, e.g. :
+#   $ cythonize -i fk_kernel.pyx
+# fk.py picks it up automatically when the extension imports, and falls back
+# to numba / plain NumPy otherwise.
+
+import numpy as np
+
+cimport cython
+from libc.math cimport cos, sin
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def fk_jacobian(double[::1] q, double[::1] a, double[::1] d,
+                double[::1] ca, double[::1] sa, double[:, ::1] base_pose):
+    """
+        One prefix sweep of the DH chain plus the Jacobian columns, identical
+        to fk._fk_jacobian_kernel : returns (J, T_0E) as float64 ndarrays.
+    """
+
+    cdef int n = q.shape[0]
+    cdef int i, r
+    cdef double c, s
+    cdef double a10, a11, a12, a13, a20, a21, a22, a23
+    cdef double t0, t1, t2
+    cdef double px, py, pz, zx, zy, zz, dx, dy, dz
+
+    Ts_arr = np.empty((n + 1, 4, 4))
+    J_arr = np.zeros((6, n))
+    cdef double[:, :, ::1] Ts = Ts_arr
+    cdef double[:, ::1] J = J_arr
+
+    for r in range(4):
+        for i in range(4):
+            Ts[0, r, i] = base_pose[r, i]
+
+    for i in range(n):
+        c = cos(q[i])
+        s = sin(q[i])
+        a10 = s * ca[i]
+        a11 = c * ca[i]
+        a12 = -sa[i]
+        a13 = -d[i] * sa[i]
+        a20 = s * sa[i]
+        a21 = c * sa[i]
+        a22 = ca[i]
+        a23 = d[i] * ca[i]
+
+        # T' = T @ A_i specialized to the DH structure of A_i
+        for r in range(3):
+            t0 = Ts[i, r, 0]
+            t1 = Ts[i, r, 1]
+            t2 = Ts[i, r, 2]
+            Ts[i + 1, r, 0] = t0 * c + t1 * a10 + t2 * a20
+            Ts[i + 1, r, 1] = -t0 * s + t1 * a11 + t2 * a21
+            Ts[i + 1, r, 2] = t1 * a12 + t2 * a22
+            Ts[i + 1, r, 3] = t0 * a[i] + t1 * a13 + t2 * a23 + Ts[i, r, 3]
+
+        Ts[i + 1, 3, 0] = 0.0
+        Ts[i + 1, 3, 1] = 0.0
+        Ts[i + 1, 3, 2] = 0.0
+        Ts[i + 1, 3, 3] = 1.0
+
+    px = Ts[n, 0, 3]
+    py = Ts[n, 1, 3]
+    pz = Ts[n, 2, 3]
+
+    for i in range(n):
+        zx = Ts[i + 1, 0, 2]
+        zy = Ts[i + 1, 1, 2]
+        zz = Ts[i + 1, 2, 2]
+        dx = px - Ts[i + 1, 0, 3]
+        dy = py - Ts[i + 1, 1, 3]
+        dz = pz - Ts[i + 1, 2, 3]
+
+        J[0, i] = zy * dz - zz * dy
+        J[1, i] = zz * dx - zx * dz
+        J[2, i] = zx * dy - zy * dx
+        J[3, i] = zx
+        J[4, i] = zy
+        J[5, i] = zz
+
+    return J_arr, Ts_arr[n].copy()
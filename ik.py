@@ -34,14 +34,14 @@ def pybullet_ik(robot, new_pose : list or tuple or np.ndarray,
 
 
 
-def calc_J_sharp(num_q: int, q: np.ndarray, DH_params: dict, base_pose: np.ndarray) -> np.matrix:
-    J = construct_jacobian(num_q, q, DH_params, base_pose)
+def calc_J_sharp(num_q: int, q: np.ndarray, DH_params: dict, base_pose: np.ndarray) -> np.ndarray:
+    J, _ = construct_jacobian(num_q, q, DH_params, base_pose)
 
     J_sharp = J.T @ np.linalg.inv(J @ J.T)
 
-    return np.matrix(J_sharp)
+    return J_sharp
 
-def is_within_limits(joint_limits: list, cur_q: list or np.matrix) -> bool:
+def is_within_limits(joint_limits: list, cur_q: list or np.ndarray) -> bool:
     for i in range(len(cur_q)):
         if not joint_limits[i][0] < cur_q[i] < joint_limits[i][1]:
             return False
@@ -94,8 +94,8 @@ def your_ik(robot, new_pose : list or tuple or np.ndarray,
     alpha = 0.01  # TODO check if this value can be iteratively adjusted according to convergence rate
     cur_it = 0
 
-    # calculate initial values
-    x_cur, _ = your_fk(robot, DH_params, tmp_q)
+    # calculate initial values (A is the base matrix, fixed across iterations)
+    x_cur, _ = your_fk(robot, DH_params, tmp_q, base_matrix=A)
     delta_x = np.array(pose_7d_to_6d(new_pose)) - np.array(pose_7d_to_6d(x_cur))
 
     threshold_reached = False
@@ -103,16 +103,15 @@ def your_ik(robot, new_pose : list or tuple or np.ndarray,
     while cur_it < max_iters:
         J_sharp = calc_J_sharp(len(tmp_q), q_new, DH_params, A)
 
-        delta_q = np.multiply(alpha, J_sharp @ delta_x).astype(float)  # alpha*J_sharp*delta_x and then force-cast it to float
+        delta_q = alpha * (J_sharp @ delta_x)  # J_sharp is a plain ndarray, so this stays a flat 7d array
 
         q_new = q_new + delta_q
-        q_new = np.squeeze(np.array(q_new))  # this is to remove the weird shape it sometimes has and nested matrices
         if not is_within_limits(joint_limits, q_new):  # TODO what should we do in this case?
             print("[Info] Joint limits reached! Aborting")
             break
         
         tmp_q = q_new
-        x_cur, _ = your_fk(robot, DH_params, tmp_q)
+        x_cur, _ = your_fk(robot, DH_params, tmp_q, base_matrix=A)
         delta_x = np.array(pose_7d_to_6d(new_pose)) - np.array(pose_7d_to_6d(x_cur))
         if np.linalg.norm(delta_x) <= stop_thresh:
             print("[Info] Iteration number ", cur_it)